@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import datetime
+import heapq
 import json
+import math
 from typing import TYPE_CHECKING
 
 import requests
 from dateutil import parser
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from .datatypes import (
         ContentDataType,
         CriteriaDataType,
@@ -17,6 +21,7 @@ if TYPE_CHECKING:
         PostDataType,
         UserJsonType,
         columns_available,
+        sortable_columns,
     )
 
 
@@ -99,6 +104,7 @@ class ChasterLock:
         self.maxtime = maxtime
         self.password_needed = password_needed
         self.keyholder = keyholder
+        self.times_seen = 1
 
     def invalid(self: ChasterLock, criteria: CriteriaDataType) -> bool:
         """Check the given criteria with itself to determine eligibility."""
@@ -150,6 +156,17 @@ class ChasterLock:
             return f"{round(self.maxtime / (60 * 60))}h"
         return f"{round(self.maxtime / 60)}m"
 
+    def sort_value(self: ChasterLock, key: sortable_columns) -> int | float:
+        """Return the value of this lock used for ranking by `key`.
+
+        Locks without a maximum time rank above all others when sorting by `maxtime`.
+        """
+        if key == "maxtime":
+            return math.inf if self.maxtime is None else self.maxtime
+        if key == "description_len":
+            return len(self.desc)
+        return len(self.name)
+
     def link(self: ChasterLock) -> str:
         """Generate a link to itself."""
         return f"https://chaster.app/explore/{self.id}"
@@ -168,6 +185,7 @@ class ChasterLock:
             "keyholder_name": self.keyholder.name,
             "keyholder_gender": self.keyholder.gender,
             "discord": self.keyholder.discord if self.keyholder.discord else "",
+            "reposts": str(self.times_seen),
         }
         for col in columns:
             row.append(options[col])
@@ -226,3 +244,72 @@ def fetch_locks(amount: int, previous_id: str | None = None) -> list[ChasterLock
     if response.status_code == success:
         return [ChasterLock.from_json(json_data) for json_data in resp_data["results"]]
     raise ChasterError(f"error {response.status_code}: {resp_data['message']}")
+
+
+def iter_locks(
+    amount: int, pages: int, previous_id: str | None = None
+) -> Iterator[ChasterLock]:
+    """Lazily fetch up to `pages` pages of locks, yielding them one at a time.
+
+    A page is only requested once the previous one has been consumed, so stopping
+    iteration early saves requests. Iteration ends when chaster.app runs out of locks.
+
+    :param amount: locks per page, see `fetch_locks()`
+    :param pages: maximum amount of pages to fetch
+    :param previous_id: the id of the lock to start after
+
+    :return: An iterator over the fetched ChasterLock objects.
+    """
+    for _ in range(pages):
+        page = fetch_locks(amount, previous_id)
+        yield from page
+        if len(page) < amount:
+            return  # no more locks available
+        previous_id = page[-1].id
+
+
+def best_possible_value(
+    key: sortable_columns, criteria: CriteriaDataType
+) -> int | float:
+    """Return the highest value a lock passing `criteria` can have for `key`."""
+    if key == "maxtime":
+        return criteria["max_max_time"] if criteria["max_max_time"] > 0 else math.inf
+    return math.inf  # title and description lengths aren't reliably limited
+
+
+def top_locks(
+    locks: Iterable[ChasterLock],
+    amount: int,
+    key: sortable_columns,
+    criteria: CriteriaDataType,
+) -> list[ChasterLock]:
+    """Find the `amount` highest ranked locks by `key` that pass `criteria`.
+
+    Only `amount` locks are kept in memory at a time. `locks` stops being consumed
+    once no remaining lock could rank higher than the ones already found.
+
+    :param locks: locks to rank, usually from `iter_locks()`
+    :param amount: amount of locks to return
+    :param key: value to rank the locks by, highest first
+    :param criteria: criteria locks have to pass, as in `ChasterLock.invalid()`
+
+    :return: List of up to `amount` ChasterLock objects, best first. Ties keep API order.
+    """
+    if amount < 1:
+        return []
+    best_possible = best_possible_value(key, criteria)
+    # min-heap of (value, -position, lock); heap[0] is the worst lock kept so far
+    heap: list[tuple[int | float, int, ChasterLock]] = []
+    for position, lock in enumerate(locks):
+        if lock.invalid(criteria):
+            continue
+        entry = (lock.sort_value(key), -position, lock)
+        if len(heap) < amount:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+        if len(heap) == amount and heap[0][0] >= best_possible:
+            break  # nothing left to find can beat what we have
+    return [
+        lock for _, _, lock in sorted(heap, key=lambda e: (e[0], e[1]), reverse=True)
+    ]
@@ -6,6 +6,7 @@ import tomlkit
 import typeguard
 
 from .datatypes import ConfigDataType, columns_available
+from .duplicates import MAX_DISTANCE
 
 
 class ConfigError(Exception):
@@ -27,6 +28,13 @@ def validate_config(config: ConfigDataType) -> bool:
     max_to_fetch = 100
     if not (1 <= config["amount_to_fetch"] <= max_to_fetch):
         raise ConfigError("`amount_to_fetch` must be between 1 and 100.")
+    if config["top_pages_to_scan"] < 1:
+        raise ConfigError("`top_pages_to_scan` must be at least 1.")
+    duplicates = config["criteria"]["duplicates"]
+    if not (0 <= duplicates["max_distance"] <= MAX_DISTANCE):
+        raise ConfigError(f"`max_distance` must be between 0 and {MAX_DISTANCE}.")
+    if duplicates["remembered_locks"] < 1:
+        raise ConfigError("`remembered_locks` must be at least 1.")
     if len(config["columns"]) != len(set(config["columns"])):
         raise ConfigError("Can't have duplicated elements in `columns`.")
     for key in config["available_columns"]:
@@ -13,8 +13,11 @@ columns_available = Literal[
     "keyholder_name",
     "keyholder_gender",
     "discord",
+    "reposts",
 ]
 
+sortable_columns = Literal["maxtime", "description_len", "name_len"]
+
 
 class ColumnConfigDataType(TypedDict):
     """Represents a single column in the [columns] table in `config.toml`."""
@@ -38,6 +41,7 @@ class ColumnsListDataType(TypedDict):
     keyholder_name: ColumnConfigDataType
     keyholder_gender: ColumnConfigDataType
     discord: ColumnConfigDataType
+    reposts: ColumnConfigDataType
 
 
 class LinksConfigDataType(TypedDict):
@@ -56,6 +60,14 @@ class BlacklistConfigDataType(TypedDict):
     keyholder_genders: list[str]
 
 
+class DuplicatesConfigDataType(TypedDict):
+    """Represents the [criteria.duplicates] table of `config.toml`."""
+
+    mode: Literal["show", "collapse", "hide"]
+    max_distance: int
+    remembered_locks: int
+
+
 class CriteriaDataType(TypedDict):
     """Represents the [criteria] table of `config.toml`."""
 
@@ -66,6 +78,7 @@ class CriteriaDataType(TypedDict):
     require_connected_discord: bool
     links: LinksConfigDataType
     blacklists: BlacklistConfigDataType
+    duplicates: DuplicatesConfigDataType
 
 
 class FormattingConfigDataType(TypedDict):
@@ -83,6 +96,7 @@ class ConfigDataType(TypedDict):
     """
 
     amount_to_fetch: int
+    top_pages_to_scan: int
     show_keyholder_names: bool
     columns: list[columns_available]
     formatting: FormattingConfigDataType
@@ -0,0 +1,293 @@
+"""Detects locks that are near-identical reposts of earlier locks by the same keyholder.
+
+Every lock's title and description are reduced to a 64 bit SimHash fingerprint.
+Fingerprints within `max_distance` differing bits of each other count as duplicates.
+To find them without comparing against every remembered lock, fingerprints are split
+into `max_distance + 1` bands: two fingerprints within that distance always share at
+least one identical band, so only locks in the same band buckets need to be compared.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import Counter, OrderedDict
+from itertools import pairwise
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from .chaster import ChasterLock
+    from .datatypes import DuplicatesConfigDataType
+
+FINGERPRINT_BITS = 64
+MAX_DISTANCE = 7  # more bands than this make each band too short to be selective
+
+
+def find_index_file() -> Path:
+    """Find `duplicates.json` and return a Path representing it."""
+    return Path(__file__).with_name("duplicates.json")
+
+
+def normalize(text: str) -> list[str]:
+    """Reduce text to a list of lowercase words, ignoring punctuation and emojis."""
+    return re.findall(r"\w+", text.casefold())
+
+
+def fingerprint(text: str) -> int | None:
+    """Calculate the SimHash of `text`, using single words and pairs of words as features.
+
+    :return: The fingerprint, or None if `text` contains no words.
+    """
+    words = normalize(text)
+    if not words:
+        return None
+    features = words + [f"{a} {b}" for a, b in pairwise(words)]
+    # each feature's hash as a string of bits, counted column by column
+    hashes = [
+        hashlib.blake2b(feature.encode(), digest_size=FINGERPRINT_BITS // 8).hexdigest()
+        for feature in features
+    ]
+    bits = [f"{int(digest, 16):0{FINGERPRINT_BITS}b}" for digest in hashes]
+    result = "".join(
+        "1" if 2 * column.count("1") > len(bits) else "0"
+        for column in zip(*bits, strict=True)
+    )
+    return int(result, 2)
+
+
+def lock_fingerprint(lock: ChasterLock) -> int | None:
+    """Calculate the fingerprint of a lock's title and description."""
+    return fingerprint(f"{lock.name}\n{lock.desc}")
+
+
+class DuplicateIndex:
+    """Remembers lock fingerprints and finds earlier locks similar to new ones.
+
+    Only the `max_size` most recently added locks are remembered.
+    """
+
+    def __init__(self: DuplicateIndex, max_distance: int, max_size: int) -> None:
+        """`DuplicateIndex` constructor.
+
+        :param max_distance: maximum amount of differing fingerprint bits for two locks
+        to count as duplicates; between 0 and `MAX_DISTANCE`
+        :param max_size: amount of locks to remember before forgetting the oldest ones
+
+        :return: None
+        """
+        if not (0 <= max_distance <= MAX_DISTANCE):
+            raise ValueError(f"`max_distance` must be between 0 and {MAX_DISTANCE}")
+        if max_size < 1:
+            raise ValueError("`max_size` must be at least 1")
+        self.max_distance = max_distance
+        self.max_size = max_size
+        bands = max_distance + 1
+        self._band_edges = [FINGERPRINT_BITS * i // bands for i in range(bands + 1)]
+        # lock id: (keyholder id, fingerprint, id of the first lock in its group)
+        self._locks: OrderedDict[str, tuple[str, int, str]] = OrderedDict()
+        # (keyholder id, band number, band value): ids of locks in that bucket
+        self._buckets: dict[tuple[str, int, int], set[str]] = {}
+        self._group_sizes: Counter[str] = Counter()
+        # whether locks were added since the index was loaded or last saved
+        self.changed = False
+
+    def __len__(self: DuplicateIndex) -> int:
+        """Return the amount of remembered locks."""
+        return len(self._locks)
+
+    def _bucket_keys(
+        self: DuplicateIndex, keyholder_id: str, value: int
+    ) -> list[tuple[str, int, int]]:
+        """Return the keys of all buckets a fingerprint belongs to."""
+        return [
+            (keyholder_id, band, value >> start & ((1 << (end - start)) - 1))
+            for band, (start, end) in enumerate(pairwise(self._band_edges))
+        ]
+
+    def _find_original(
+        self: DuplicateIndex, keyholder_id: str, value: int
+    ) -> str | None:
+        """Return the group of the closest remembered duplicate, if there is one."""
+        best: tuple[int, str] | None = None
+        for key in self._bucket_keys(keyholder_id, value):
+            for candidate in self._buckets.get(key, ()):
+                _, other, original = self._locks[candidate]
+                distance = (value ^ other).bit_count()
+                if distance <= self.max_distance and (
+                    best is None or distance < best[0]
+                ):
+                    best = (distance, original)
+        return None if best is None else best[1]
+
+    def insert(
+        self: DuplicateIndex, lock_id: str, keyholder_id: str, value: int, original: str
+    ) -> None:
+        """Remember a lock, forgetting the oldest one if the index is full."""
+        if len(self._locks) >= self.max_size:
+            old_id, (old_keyholder, old_value, old_original) = self._locks.popitem(
+                last=False
+            )
+            for key in self._bucket_keys(old_keyholder, old_value):
+                self._buckets[key].discard(old_id)
+                if not self._buckets[key]:
+                    del self._buckets[key]
+            self._group_sizes[old_original] -= 1
+            if self._group_sizes[old_original] <= 0:
+                del self._group_sizes[old_original]
+        self._locks[lock_id] = (keyholder_id, value, original)
+        for key in self._bucket_keys(keyholder_id, value):
+            self._buckets.setdefault(key, set()).add(lock_id)
+        self._group_sizes[original] += 1
+        self.changed = True
+
+    def group_size(self: DuplicateIndex, original: str) -> int:
+        """Return the amount of remembered locks in the group started by `original`.
+
+        Locks that aren't remembered count as a group of one.
+        """
+        return max(self._group_sizes[original], 1)
+
+    def add(self: DuplicateIndex, lock: ChasterLock) -> str:
+        """Remember a lock and look up which earlier lock it duplicates.
+
+        Adding the same lock again does not count it twice. Locks without any words in
+        their title and description can't be compared, so they aren't remembered.
+
+        :param lock: the lock to add
+
+        :return: The id of the first remembered lock in this lock's group of duplicates,
+        or the lock's own id if it isn't a duplicate.
+        """
+        if lock.id in self._locks:
+            return self._locks[lock.id][2]
+        value = lock_fingerprint(lock)
+        if value is None:
+            return lock.id
+        original = self._find_original(lock.keyholder.id, value) or lock.id
+        self.insert(lock.id, lock.keyholder.id, value, original)
+        return original
+
+    def save(self: DuplicateIndex, path: Path) -> None:
+        """Write remembered locks to `path`, oldest first, if any were added.
+
+        The file is written next to `path` first and then moved into place, so an
+        interrupted save leaves the previous file intact.
+        """
+        if not self.changed:
+            return
+        temporary = path.with_name(f"{path.name}.tmp")
+        with temporary.open("w") as file:
+            json.dump(
+                [
+                    [lock_id, keyholder_id, value, original]
+                    for lock_id, (keyholder_id, value, original) in self._locks.items()
+                ],
+                file,
+            )
+        temporary.replace(path)
+        self.changed = False
+
+    @classmethod
+    def load(
+        cls: type[DuplicateIndex], path: Path, max_distance: int, max_size: int
+    ) -> DuplicateIndex:
+        """Create a DuplicateIndex from locks saved with `save()`, if `path` exists.
+
+        A damaged file is ignored with a warning, starting over with an empty index.
+        """
+        index = cls(max_distance, max_size)
+        if not path.exists():
+            return index
+        try:
+            with path.open("r") as file:
+                for lock_id, keyholder_id, value, original in json.load(file):
+                    index.insert(lock_id, keyholder_id, value, original)
+        except (ValueError, TypeError):  # includes json.JSONDecodeError
+            print(f"{path} is damaged, previously seen locks were forgotten.")
+            index = cls(max_distance, max_size)
+        index.changed = False
+        return index
+
+
+def update_index(
+    index: DuplicateIndex | None, config: DuplicatesConfigDataType
+) -> DuplicateIndex | None:
+    """Return a duplicate index matching the given settings, reusing `index` if it does.
+
+    When the settings changed, `index` is saved and loaded again with the new ones.
+
+    :param index: the index currently in use, or None if there is none
+    :param config: the [criteria.duplicates] table of the config
+
+    :return: The index to use, or None if duplicate detection is turned off.
+    """
+    if config["mode"] == "show":
+        return None
+    if (
+        index is not None
+        and index.max_distance == config["max_distance"]
+        and index.max_size == config["remembered_locks"]
+    ):
+        return index
+    if index is not None:
+        index.save(find_index_file())
+    return DuplicateIndex.load(
+        find_index_file(), config["max_distance"], config["remembered_locks"]
+    )
+
+
+def unique_locks(
+    locks: Iterable[ChasterLock],
+    index: DuplicateIndex,
+    config: DuplicatesConfigDataType,
+) -> Iterator[ChasterLock]:
+    """Lazily remove near-duplicate locks according to `config["mode"]`.
+
+    In "hide" mode, locks similar to an earlier remembered lock are removed. In
+    "collapse" mode, only the first lock of each group of duplicates in `locks` is kept.
+
+    :param locks: locks that passed all other criteria, in the order they will be shown
+    :param index: the index to look up and remember locks in
+    :param config: the [criteria.duplicates] table of the config
+
+    :return: An iterator over the remaining locks, in their original order.
+    """
+    shown_groups: set[str] = set()
+    for lock in locks:
+        original = index.add(lock)
+        if config["mode"] == "hide" and original != lock.id:
+            continue
+        if original in shown_groups:
+            continue
+        shown_groups.add(original)
+        yield lock
+
+
+def count_reposts(locks: Iterable[ChasterLock], index: DuplicateIndex) -> None:
+    """Set `times_seen` of every lock to the size of its group of duplicates."""
+    for lock in locks:
+        lock.times_seen = index.group_size(index.add(lock))
+
+
+def filter_duplicates(
+    locks: Iterable[ChasterLock],
+    index: DuplicateIndex,
+    config: DuplicatesConfigDataType,
+) -> list[ChasterLock]:
+    """Remove or collapse near-duplicate locks and count how often the rest were posted.
+
+    See `unique_locks()` for the modes.
+
+    :param locks: locks that passed all other criteria, in the order they will be shown
+    :param index: the index to look up and remember locks in
+    :param config: the [criteria.duplicates] table of the config
+
+    :return: The remaining locks, in their original order.
+    """
+    result = list(unique_locks(locks, index, config))
+    count_reposts(result, index)
+    return result
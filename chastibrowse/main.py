@@ -3,20 +3,179 @@
 import os
 import sys
 import time
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, cast, get_args
 
 import pkg_resources
 
-from . import chaster, format_table
+from . import chaster, duplicates, format_table
 from .config_helper import load_config, min_widths, write_config
-from .datatypes import ConfigDataType
+from .datatypes import ConfigDataType, sortable_columns
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
-def handle_user_input(
+
+def top_from_api(
+    amount: int,
+    key: sortable_columns,
+    config_data: ConfigDataType,
+    lastid: str | None,
+    duplicate_index: duplicates.DuplicateIndex | None,
+) -> list[chaster.ChasterLock]:
+    """Rank the locks of the next `top_pages_to_scan` pages after `lastid`.
+
+    :param amount: amount of locks to return
+    :param key: value to rank the locks by
+    :param config_data: a set of config data, as loaded by `load_config()`
+    :param lastid: the id of the lock to start scanning after
+    :param duplicate_index: index used to filter near-duplicates, None if turned off
+
+    :return: List of up to `amount` ChasterLock objects, best first.
+    """
+    print(f"Scanning up to {config_data['top_pages_to_scan']} pages...")
+    locks: Iterable[chaster.ChasterLock] = chaster.iter_locks(
+        config_data["amount_to_fetch"], config_data["top_pages_to_scan"], lastid
+    )
+    if duplicate_index is not None:
+        locks = duplicates.unique_locks(
+            (lock for lock in locks if not lock.invalid(config_data["criteria"])),
+            duplicate_index,
+            config_data["criteria"]["duplicates"],
+        )
+    best = chaster.top_locks(locks, amount, key, config_data["criteria"])
+    if duplicate_index is not None:
+        duplicates.count_reposts(best, duplicate_index)
+        duplicate_index.save(duplicates.find_index_file())
+    return best
+
+
+def top_from_snapshot(
+    amount: int,
+    key: sortable_columns,
+    config_data: ConfigDataType,
+    duplicate_index: duplicates.DuplicateIndex | None,
+) -> list[chaster.ChasterLock] | None:
+    """Rank the locks saved with the `snapshot` command.
+
+    :param amount: amount of locks to return
+    :param key: value to rank the locks by
+    :param config_data: a set of config data, as loaded by `load_config()`
+    :param duplicate_index: index used to filter near-duplicates, None if turned off
+
+    :return: List of up to `amount` ChasterLock objects, best first,
+    or None if the snapshot can't be used.
+    """
+    try:
+        from . import snapshot
+    except ImportError as e:  # numpy is an optional dependency
+        print(e)
+        return None
+    try:
+        saved = snapshot.LockSnapshot.load(snapshot.find_snapshot_dir())
+    except snapshot.SnapshotError:
+        print("No snapshot found, create one with `snapshot [pages]` first.")
+        return None
+    if duplicate_index is None:
+        return saved.top_locks(amount, key, config_data["criteria"])
+    locks = duplicates.unique_locks(
+        saved.ranked_locks(key, config_data["criteria"]),
+        duplicate_index,
+        config_data["criteria"]["duplicates"],
+    )
+    best = list(islice(locks, amount))
+    duplicates.count_reposts(best, duplicate_index)
+    duplicate_index.save(duplicates.find_index_file())
+    return best
+
+
+def show_top(
+    user_input: str,
+    config_data: ConfigDataType,
+    lastid: str | None,
+    duplicate_index: duplicates.DuplicateIndex | None,
+) -> None:
+    """Handle the `top [amount] by [key] [snapshot]` command, printing the best locks found.
+
+    Scans `top_pages_to_scan` pages starting at `lastid`, or the saved snapshot if the
+    command ends with "snapshot".
+
+    :param user_input: the given user command, starting with "top"
+    :param config_data: a set of config data, as loaded by `load_config()`
+    :param lastid: the id of the lock to start scanning after
+    :param duplicate_index: index used to filter near-duplicates, None if turned off
+
+    :return: None
+    """
+    parts = user_input.split(" ")
+    keys = get_args(sortable_columns)
+    command_lengths = (4, 5)  # top, amount, by, key[, snapshot]
+    if (
+        len(parts) not in command_lengths
+        or not parts[1].isdigit()
+        or int(parts[1]) < 1
+        or parts[2] != "by"
+        or parts[3] not in keys
+        or parts[4:] not in ([], ["snapshot"])
+    ):
+        print(f"Usage: top [amount] by [{'|'.join(keys)}] [snapshot]")
+        time.sleep(1)
+        return
+    key = cast(sortable_columns, parts[3])
+    if parts[4:]:
+        best = top_from_snapshot(int(parts[1]), key, config_data, duplicate_index)
+    else:
+        best = top_from_api(int(parts[1]), key, config_data, lastid, duplicate_index)
+    if best is None:
+        time.sleep(3)
+        return
+    if len(best) == 0:
+        print("All locks were excluded due to filters.")
+    else:
+        table = [lock.to_list(config_data["columns"]) for lock in best]
+        print(format_table.table(data=table, config=config_data))
+    input("Press enter to return. ")
+
+
+def save_snapshot(
+    user_input: str, config_data: ConfigDataType, lastid: str | None
+) -> None:
+    """Handle the `snapshot [pages]` command, saving locks for later analysis.
+
+    :param user_input: the given user command, starting with "snapshot"
+    :param config_data: a set of config data, as loaded by `load_config()`
+    :param lastid: the id of the lock to start fetching after
+
+    :return: None
+    """
+    parts = user_input.split(" ")
+    command_length = 2  # snapshot, pages
+    if len(parts) != command_length or not parts[1].isdigit() or int(parts[1]) < 1:
+        print("Usage: snapshot [pages]")
+        time.sleep(1)
+        return
+    try:
+        from . import snapshot
+    except ImportError as e:  # numpy is an optional dependency
+        print(e)
+        time.sleep(3)
+        return
+    print(f"Fetching up to {parts[1]} pages...")
+    locks = list(
+        chaster.iter_locks(config_data["amount_to_fetch"], int(parts[1]), lastid)
+    )
+    snapshot.write_snapshot(locks, snapshot.find_snapshot_dir())
+    print(f"Saved {len(locks)} locks to {snapshot.find_snapshot_dir()}")
+    time.sleep(3)
+
+
+def handle_user_input(  # noqa: C901, PLR0911, PLR0912
     user_input: str,
     config_data: ConfigDataType,
     newlocks: list[chaster.ChasterLock],
     lastid: str | None,
+    duplicate_index: duplicates.DuplicateIndex | None = None,
 ) -> str | None:
     """Handle the given user command and return a new `lastid` depending on the action taken.
 
@@ -24,6 +183,7 @@ def handle_user_input(
     :param config_data: a set of config data, as loaded by `load_config()`
     :param newlocks: list of new locks, used for determining last lock seen
     :param lastid: the previous `lastid`. will be returned if the same locks are to be loaded again.
+    :param duplicate_index: index used to filter near-duplicates, None if turned off
 
     :return: Returns a new value for `lastid` depending on the action taken.
     """
@@ -36,6 +196,8 @@ def handle_user_input(
     ]:
         sys.exit(0)
     elif user_input == "reload":
+        if duplicate_index is not None:
+            duplicate_index.save(duplicates.find_index_file())
         main(lastid)  # restart at current shown locks
         sys.exit(0)
     elif user_input == "config":
@@ -53,6 +215,12 @@ def handle_user_input(
             print("user already blacklisted!")
             time.sleep(1)
         return lastid  # show previous locks
+    elif user_input.startswith("top"):
+        show_top(user_input, config_data, lastid, duplicate_index)
+        return lastid  # show previous locks
+    elif user_input.startswith("snapshot"):
+        save_snapshot(user_input, config_data, lastid)
+        return lastid  # show previous locks
     elif user_input.startswith("help"):
         print(
             "Press enter without any input to load more locks.\n"
@@ -61,6 +229,10 @@ def handle_user_input(
             "reload               : Reload Chastibrowse. Run after resizing terminal.\n"
             "config               : Find and show location of config file.\n"
             "blacklist [username] : Add a chaster.app username to the user blacklist.\n"
+            "top [n] by [key]     : Show the n best locks of the next few pages by key.\n"
+            "                       key is one of: maxtime, description_len, name_len\n"
+            "                       add 'snapshot' to rank the saved snapshot instead.\n"
+            "snapshot [pages]     : Save the next few pages of locks for analysis.\n"
             "help                 : Show this message.\n"
             "\n"
             "Commands are not case-sensitive."
@@ -85,38 +257,52 @@ def main(lastid: str | None = None) -> None:
             "Your terminal is very thin! If you can, make it wider, then reload.\n" * 5
         )
         time.sleep(3)
-    while True:
-        config_data = load_config()
-        newlocks = chaster.fetch_locks(config_data["amount_to_fetch"], lastid)
-        table: list[list[str]] = []
-        for lock in newlocks:
-            if not lock.invalid(config_data["criteria"]):
-                table.append(lock.to_list(config_data["columns"]))
-        if len(table) == 0:
-            print(
-                "All locks were excluded due to filters. "
-                "Consider increasing `amount_to_fetch` if this happens often."
+    duplicate_index: duplicates.DuplicateIndex | None = None
+    try:
+        while True:
+            config_data = load_config()
+            duplicate_index = duplicates.update_index(
+                duplicate_index, config_data["criteria"]["duplicates"]
             )
-            time.sleep(1)
-            print("Loading more...")
-            lastid = newlocks[-1].id
-            continue
+            newlocks = chaster.fetch_locks(config_data["amount_to_fetch"], lastid)
+            valid_locks = [
+                lock for lock in newlocks if not lock.invalid(config_data["criteria"])
+            ]
+            if duplicate_index is not None:
+                valid_locks = duplicates.filter_duplicates(
+                    valid_locks, duplicate_index, config_data["criteria"]["duplicates"]
+                )
+            table = [lock.to_list(config_data["columns"]) for lock in valid_locks]
+            if len(table) == 0:
+                print(
+                    "All locks were excluded due to filters. "
+                    "Consider increasing `amount_to_fetch` if this happens often."
+                )
+                time.sleep(1)
+                print("Loading more...")
+                lastid = newlocks[-1].id
+                continue
 
-        if len(config_data["columns"]) == 0:
-            print("Well, what did you expect to happen?")
-            time.sleep(1)
-        print(format_table.table(data=table, config=config_data))
+            if len(config_data["columns"]) == 0:
+                print("Well, what did you expect to happen?")
+                time.sleep(1)
+            print(format_table.table(data=table, config=config_data))
 
-        user_input = (
-            input(
-                f"(Chastibrowse {pkg_resources.get_distribution('chastibrowse').version}) | "
-                f"Code: {lastid} | Enter 'help' | > "
+            user_input = (
+                input(
+                    f"(Chastibrowse {pkg_resources.get_distribution('chastibrowse').version}) | "
+                    f"Code: {lastid} | Enter 'help' | > "
+                )
+                .casefold()
+                .strip()
             )
-            .casefold()
-            .strip()
-        )
 
-        lastid = handle_user_input(user_input, config_data, newlocks, lastid)
+            lastid = handle_user_input(
+                user_input, config_data, newlocks, lastid, duplicate_index
+            )
+    finally:  # also on exit, Ctrl+C and crashes
+        if duplicate_index is not None:
+            duplicate_index.save(duplicates.find_index_file())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,427 @@
+"""Columnar on-disk snapshots of many locks, filtered with NumPy instead of per lock.
+
+A snapshot is a directory of `.npy` files, one per column, plus a json table of
+keyholders. Each string field (lock ids, titles and descriptions) lives in its own
+byte blob of NUL separated strings, indexed by an array of offsets. Loading
+memory-maps every array, so nothing is read from disk until it's used.
+
+Requires numpy, which can be installed with `pip install chastibrowse[snapshots]`.
+"""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+try:
+    import numpy as np
+except ModuleNotFoundError as e:
+    raise ImportError(
+        "Snapshots need numpy, install it with `pip install chastibrowse[snapshots]`."
+    ) from e
+
+from .chaster import ChasterLock, ChasterUser
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from numpy.typing import NDArray
+
+    from .datatypes import CriteriaDataType, sortable_columns
+
+
+class SnapshotError(Exception):
+    """Represents a snapshot that couldn't be read."""
+
+
+# column name: numpy dtype; maxtime is 0 for locks without a maximum time
+COLUMNS: dict[str, type[np.generic]] = {
+    "maxtime": np.int64,
+    "has_maxtime": np.bool_,
+    "description_len": np.int32,
+    "title_len": np.int32,
+    "password_needed": np.bool_,
+    "findom": np.bool_,
+    "suspended": np.bool_,
+    "has_discord": np.bool_,
+    "keyholder": np.int32,
+    "linked_title": np.bool_,
+    "linked_description": np.bool_,
+    "desc_startswith_link": np.bool_,
+}
+# titles are also stored casefolded, to search them for blacklisted keywords
+STRING_FIELDS = ("id", "title", "title_casefolded", "description")
+# bytes of string blobs compared at once when searching for keywords
+SEARCH_CHUNK_SIZE = 1 << 22
+
+
+def find_snapshot_dir() -> Path:
+    """Find the default snapshot directory and return a Path representing it."""
+    return Path(__file__).with_name("snapshot")
+
+
+def write_snapshot(locks: Sequence[ChasterLock], directory: Path) -> None:
+    """Write locks to `directory` as a snapshot, replacing any snapshot already there.
+
+    The snapshot is written to a temporary directory first and then moved into place,
+    so an interrupted write leaves the previous snapshot intact.
+
+    :param locks: the locks to store
+    :param directory: directory to write the snapshot to; created if needed
+
+    :return: None
+    """
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    temporary = Path(
+        tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent)
+    )
+    try:
+        write_snapshot_files(locks, temporary)
+    except BaseException:
+        shutil.rmtree(temporary)
+        raise
+    old = directory.with_name(f".{directory.name}-old")
+    shutil.rmtree(old, ignore_errors=True)
+    if directory.exists():
+        directory.rename(old)
+    temporary.rename(directory)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_snapshot_files(locks: Sequence[ChasterLock], directory: Path) -> None:
+    """Write the files making up a snapshot of `locks` into an existing `directory`."""
+    keyholders: dict[str, int] = {}
+    keyholder_table: list[list[str]] = []
+    for lock in locks:
+        if lock.keyholder.id not in keyholders:
+            keyholders[lock.keyholder.id] = len(keyholder_table)
+            keyholder_table.append(
+                [
+                    lock.keyholder.id,
+                    lock.keyholder.name,
+                    lock.keyholder.gender,
+                    lock.keyholder.discord or "",
+                ]
+            )
+
+    values: dict[str, list[int | bool]] = {
+        "maxtime": [lock.maxtime or 0 for lock in locks],
+        "has_maxtime": [lock.maxtime is not None for lock in locks],
+        "description_len": [len(lock.desc) for lock in locks],
+        "title_len": [len(lock.name) for lock in locks],
+        "password_needed": [lock.password_needed for lock in locks],
+        "findom": [lock.keyholder.findom for lock in locks],
+        "suspended": [lock.keyholder.suspended for lock in locks],
+        "has_discord": [bool(lock.keyholder.discord) for lock in locks],
+        "keyholder": [keyholders[lock.keyholder.id] for lock in locks],
+        "linked_title": ["chaster.app" in lock.name for lock in locks],
+        "linked_description": ["chaster.app" in lock.desc.casefold() for lock in locks],
+        "desc_startswith_link": [
+            lock.desc.casefold().startswith("https://chaster.app") for lock in locks
+        ],
+    }
+    for name, dtype in COLUMNS.items():
+        np.save(directory / f"{name}.npy", np.array(values[name], dtype=dtype))
+
+    texts: dict[str, list[str]] = {
+        "id": [lock.id for lock in locks],
+        "title": [lock.name for lock in locks],
+        "title_casefolded": [lock.name.casefold() for lock in locks],
+        "description": [lock.desc for lock in locks],
+    }
+    for field in STRING_FIELDS:
+        encoded = [text.encode() for text in texts[field]]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) + 1 for text in encoded], out=offsets[1:])
+        np.save(directory / f"{field}_offsets.npy", offsets)
+        blob = np.frombuffer(b"".join(text + b"\0" for text in encoded), dtype=np.uint8)
+        np.save(directory / f"{field}.npy", blob)
+        np.save(
+            directory / f"{field}_byte_counts.npy", np.bincount(blob, minlength=256)
+        )
+
+    with (directory / "keyholders.json").open("w") as file:
+        json.dump(keyholder_table, file)
+
+
+def chunk_hits(
+    chunk: NDArray[np.uint8],
+    string_starts: NDArray[np.int64],
+    keyword: bytes,
+    by_rarity: Sequence[int],
+) -> NDArray[np.bool_]:
+    """Return which strings of a chunk of a string blob contain `keyword`.
+
+    Possible matches are found by comparing the whole chunk with the keyword's two
+    rarest bytes, then checked against the remaining bytes.
+
+    :param chunk: NUL separated strings
+    :param string_starts: where each string starts in `chunk`
+    :param keyword: a non-empty byte string to search for
+    :param by_rarity: positions in `keyword`, rarest byte in the blob first
+
+    :return: A boolean array with an entry for every string.
+    """
+    # a match can't leave its string, so it lies entirely inside the chunk
+    possible = max(len(chunk) - len(keyword) + 1, 0)
+    found = np.zeros(len(chunk), dtype=np.bool_)
+    np.equal(
+        chunk[by_rarity[0] :][:possible], keyword[by_rarity[0]], out=found[:possible]
+    )
+    if len(by_rarity) > 1:
+        found[:possible] &= chunk[by_rarity[1] :][:possible] == keyword[by_rarity[1]]
+    if not found.any():
+        return np.zeros(len(string_starts), dtype=np.bool_)
+    if len(keyword) <= 2 and b"\0" not in keyword:  # noqa: PLR2004
+        # every byte is checked and no match can span two strings
+        return np.logical_or.reduceat(found, string_starts)
+    starts = np.flatnonzero(found)
+    for position in by_rarity[2:]:
+        starts = starts[chunk[starts + position] == keyword[position]]
+    rows = np.searchsorted(string_starts, starts, side="right") - 1
+    string_ends = np.append(string_starts[1:], len(chunk)) - 1  # the NUL bytes
+    # only keywords containing NUL can run over into the next string
+    inside = starts + len(keyword) <= string_ends[rows]
+    result = np.zeros(len(string_starts), dtype=np.bool_)
+    result[rows[inside]] = True
+    return result
+
+
+class LockSnapshot:
+    """A snapshot of locks as loaded by `LockSnapshot.load()`."""
+
+    def __init__(
+        self: LockSnapshot,
+        columns: dict[str, NDArray[Any]],
+        strings: dict[str, NDArray[np.uint8]],
+        string_offsets: dict[str, NDArray[np.int64]],
+        byte_counts: dict[str, NDArray[np.int64]],
+        keyholders: list[list[str]],
+    ) -> None:
+        """`LockSnapshot` constructor.
+
+        :param columns: one array per entry in `COLUMNS`, all of the same length
+        :param strings: one utf-8 encoded blob per entry in `STRING_FIELDS`
+        :param string_offsets: per field, the start of every string in its blob,
+        plus the end of the blob
+        :param byte_counts: per field, how often each byte value occurs in its blob
+        :param keyholders: id, name, gender and discord username of every keyholder
+
+        :return: None
+        """
+        self.columns = columns
+        self.strings = strings
+        self.string_offsets = string_offsets
+        self.byte_counts = byte_counts
+        self.keyholders = keyholders
+
+    def __len__(self: LockSnapshot) -> int:
+        """Return the amount of locks in the snapshot."""
+        return len(self.columns["maxtime"])
+
+    @classmethod
+    def load(cls: type[LockSnapshot], directory: Path) -> LockSnapshot:
+        """Memory-map the snapshot in `directory`, checking that its files fit together."""
+        try:
+            columns = {
+                name: np.load(directory / f"{name}.npy", mmap_mode="r")
+                for name in COLUMNS
+            }
+            strings = {
+                field: np.load(directory / f"{field}.npy", mmap_mode="r")
+                for field in STRING_FIELDS
+            }
+            offsets = {
+                field: np.load(directory / f"{field}_offsets.npy", mmap_mode="r")
+                for field in STRING_FIELDS
+            }
+            byte_counts = {
+                field: np.load(directory / f"{field}_byte_counts.npy")
+                for field in STRING_FIELDS
+            }
+            with (directory / "keyholders.json").open("r") as file:
+                keyholders = json.load(file)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Can't read snapshot in {directory}.") from e
+        snapshot = cls(columns, strings, offsets, byte_counts, keyholders)
+        if not snapshot.consistent():
+            raise SnapshotError(f"Snapshot in {directory} is incomplete or damaged.")
+        return snapshot
+
+    def consistent(self: LockSnapshot) -> bool:
+        """Check that all columns and strings describe the same amount of locks."""
+        length = len(self)
+        for field in STRING_FIELDS:
+            offsets = self.string_offsets[field]
+            if (
+                len(offsets) != length + 1
+                or offsets[0] != 0
+                or offsets[-1] != len(self.strings[field])
+                or len(self.byte_counts[field]) != 256  # noqa: PLR2004
+            ):
+                return False
+        return all(len(column) == length for column in self.columns.values()) and (
+            length == 0 or int(self.columns["keyholder"].max()) < len(self.keyholders)
+        )
+
+    def string(self: LockSnapshot, index: int, field: str) -> str:
+        """Decode one of the `STRING_FIELDS` of the lock at position `index`."""
+        offsets = self.string_offsets[field]
+        start, end = offsets[index], offsets[index + 1] - 1  # without the NUL byte
+        return bytes(self.strings[field][start:end]).decode()
+
+    def lock(self: LockSnapshot, index: int) -> ChasterLock:
+        """Recreate the ChasterLock at position `index`."""
+        keyholder_id, name, gender, discord = self.keyholders[
+            int(self.columns["keyholder"][index])
+        ]
+        return ChasterLock(
+            self.string(index, "id"),
+            self.string(index, "title"),
+            self.string(index, "description"),
+            (
+                int(self.columns["maxtime"][index])
+                if self.columns["has_maxtime"][index]
+                else None
+            ),
+            bool(self.columns["password_needed"][index]),
+            ChasterUser(
+                keyholder_id,
+                name,
+                bool(self.columns["findom"][index]),
+                gender,
+                discord or None,
+                bool(self.columns["suspended"][index]),
+            ),
+        )
+
+    def keyholder_mask(
+        self: LockSnapshot, criteria: CriteriaDataType
+    ) -> NDArray[np.bool_]:
+        """Return which keyholders pass the user and gender blacklists."""
+        users = {user.casefold() for user in criteria["blacklists"]["users"]}
+        genders = {
+            gender.casefold() for gender in criteria["blacklists"]["keyholder_genders"]
+        }
+        return np.array(
+            [
+                name.casefold() not in users and gender.casefold() not in genders
+                for _, name, gender, _ in self.keyholders
+            ],
+            dtype=np.bool_,
+        )
+
+    def column_mask(
+        self: LockSnapshot, criteria: CriteriaDataType
+    ) -> NDArray[np.bool_]:
+        """Return which locks pass every rule of `criteria` except the keyword blacklist.
+
+        Each rule is evaluated on whole columns at once.
+        """
+        cols = self.columns
+        valid = cols["description_len"] >= criteria["minimum_description_length"]
+        if not criteria["show_findom"]:
+            valid &= ~cols["findom"]
+        if criteria["max_max_time"] > 0:
+            valid &= cols["has_maxtime"] & (cols["maxtime"] <= criteria["max_max_time"])
+        if not criteria["links"]["show_linked_titles"]:
+            valid &= ~cols["linked_title"]
+        if not criteria["links"]["show_linked_descriptions"]:
+            valid &= ~cols["linked_description"]
+        if not criteria["links"]["show_desc_startswith_link"]:
+            valid &= ~cols["desc_startswith_link"]
+        if not criteria["show_suspended_keyholders"]:
+            valid &= ~cols["suspended"]
+        if criteria["require_connected_discord"]:
+            valid &= cols["has_discord"]
+        if (
+            criteria["blacklists"]["users"]
+            or criteria["blacklists"]["keyholder_genders"]
+        ):
+            valid &= self.keyholder_mask(criteria)[cols["keyholder"]]
+        return valid
+
+    def keyword_hits(
+        self: LockSnapshot, field: str, keyword: bytes, candidates: NDArray[np.bool_]
+    ) -> NDArray[np.bool_]:
+        """Return which of the `candidates` contain `keyword` in one of the `STRING_FIELDS`.
+
+        The blob is searched a chunk of whole strings at a time with array comparisons,
+        skipping chunks without candidates.
+        """
+        if not keyword:
+            return candidates.copy()  # every string contains the empty string
+        hits = np.zeros(len(self), dtype=np.bool_)
+        counts = self.byte_counts[field]
+        # keyword positions, rarest byte first
+        by_rarity = sorted(range(len(keyword)), key=lambda i: counts[keyword[i]])
+        if counts[keyword[by_rarity[0]]] == 0:
+            return hits
+        # plain ndarray views of the memory maps compare noticeably faster
+        blob = np.asarray(self.strings[field])
+        offsets = np.asarray(self.string_offsets[field])
+        first = 0
+        while first < len(self):
+            # the chunk holds locks first to last - 1, always at least one
+            last = int(np.searchsorted(offsets, offsets[first] + SEARCH_CHUNK_SIZE)) - 1
+            last = min(max(last, first + 1), len(self))
+            if candidates[first:last].any():
+                chunk = blob[offsets[first] : offsets[last]]
+                string_starts = offsets[first:last] - offsets[first]
+                hits[first:last] = chunk_hits(chunk, string_starts, keyword, by_rarity)
+            first = last
+        return hits & candidates
+
+    def mask(self: LockSnapshot, criteria: CriteriaDataType) -> NDArray[np.bool_]:
+        """Return which locks pass `criteria`; the counterpart of `ChasterLock.invalid()`.
+
+        Like there, keywords are searched for in titles ignoring case and in
+        descriptions case-sensitively.
+        """
+        valid = self.column_mask(criteria)
+        for word in criteria["blacklists"]["keywords"]:
+            title = word.casefold().encode()
+            valid &= ~self.keyword_hits("title_casefolded", title, valid)
+            valid &= ~self.keyword_hits("description", word.encode(), valid)
+        return valid
+
+    def sort_values(self: LockSnapshot, key: sortable_columns) -> NDArray[np.float64]:
+        """Return the value of every lock used for ranking by `key`.
+
+        See `ChasterLock.sort_value()`.
+        """
+        if key == "maxtime":
+            return np.where(
+                self.columns["has_maxtime"], self.columns["maxtime"], np.inf
+            )
+        if key == "description_len":
+            return self.columns["description_len"].astype(np.float64)
+        return self.columns["title_len"].astype(np.float64)
+
+    def ranked_locks(
+        self: LockSnapshot, key: sortable_columns, criteria: CriteriaDataType
+    ) -> Iterator[ChasterLock]:
+        """Lazily yield all locks passing `criteria`, highest ranked by `key` first.
+
+        Ties keep snapshot order. Locks are only recreated as they are consumed.
+        """
+        valid = np.flatnonzero(self.mask(criteria))
+        order = np.lexsort((valid, -self.sort_values(key)[valid]))
+        for index in valid[order]:
+            yield self.lock(int(index))
+
+    def top_locks(
+        self: LockSnapshot,
+        amount: int,
+        key: sortable_columns,
+        criteria: CriteriaDataType,
+    ) -> list[ChasterLock]:
+        """Find the `amount` highest ranked locks by `key` that pass `criteria`.
+
+        The snapshot equivalent of `chaster.top_locks()`. Ties keep snapshot order.
+        """
+        return list(islice(self.ranked_locks(key, criteria), amount))